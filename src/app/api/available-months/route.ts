@@ -1,13 +1,6 @@
-import { Pool } from 'pg';
 import { NextResponse } from 'next/server';
-
-// Initialize Neon PG client
-const pool = new Pool({
-  connectionString: process.env.NEON_DATABASE_URL,
-  ssl: {
-    rejectUnauthorized: false, // Required for Neon connection
-  },
-});
+import { unstable_cache } from 'next/cache';
+import { withClient, RECEIPTS_CACHE_TAG, RECEIPTS_CACHE_TTL_SECONDS } from '@/lib/db';
 
 interface AvailableMonth {
   year: number;
@@ -16,12 +9,15 @@ interface AvailableMonth {
   receiptCount: number;
 }
 
-export async function GET() {
-  const client = await pool.connect();
+const monthLabels = [
+  'January', 'February', 'March', 'April', 'May', 'June',
+  'July', 'August', 'September', 'October', 'November', 'December'
+];
 
-  try {
+const getMonthRows = unstable_cache(
+  async () => {
     // Query to get all months with completed receipts
-    const result = await client.query<{ year: number; month: number; receipt_count: string }>(
+    const result = await withClient(client => client.query<{ year: number; month: number; receipt_count: string }>(
       `SELECT 
          EXTRACT(YEAR FROM purchase_datetime) as year,
          EXTRACT(MONTH FROM purchase_datetime) as month,
@@ -30,15 +26,19 @@ export async function GET() {
        WHERE processing_status = 'COMPLETE'
        GROUP BY EXTRACT(YEAR FROM purchase_datetime), EXTRACT(MONTH FROM purchase_datetime)
        ORDER BY year DESC, month DESC`
-    );
+    ));
+    return result.rows;
+  },
+  ['available-months'],
+  { revalidate: RECEIPTS_CACHE_TTL_SECONDS, tags: [RECEIPTS_CACHE_TAG] }
+);
 
-    // Format the results
-    const monthLabels = [
-      'January', 'February', 'March', 'April', 'May', 'June',
-      'July', 'August', 'September', 'October', 'November', 'December'
-    ];
+export async function GET() {
+  try {
+    const rows = await getMonthRows();
 
-    const availableMonths: AvailableMonth[] = result.rows.map(row => ({
+    // Format the results
+    const availableMonths: AvailableMonth[] = rows.map(row => ({
       year: row.year,
       month: row.month,
       label: `${monthLabels[row.month - 1]} ${row.year}`,
@@ -53,7 +53,5 @@ export async function GET() {
       { message: 'Failed to fetch available months', error: (error as Error).message },
       { status: 500 }
     );
-  } finally {
-    client.release();
   }
 } 
\ No newline at end of file
@@ -1,15 +1,6 @@
-import { Pool } from 'pg';
 import { NextResponse, NextRequest } from 'next/server';
-
-const pool = new Pool({
-  connectionString: process.env.NEON_DATABASE_URL,
-  ssl: { rejectUnauthorized: false },
-});
-
-interface CategorySpending {
-  category: string | null;
-  total_amount: number;
-}
+import { unstable_cache } from 'next/cache';
+import { withClient, RECEIPTS_CACHE_TAG, RECEIPTS_CACHE_TTL_SECONDS } from '@/lib/db';
 
 interface SpendingByDay {
   day: number;
@@ -60,8 +51,104 @@ function getDateRangeForPeriod(period: TimePeriod): { startDate: Date | null; en
   }
 }
 
+// First day of a month as a plain YYYY-MM-DD string. Postgres reads it like the
+// receipts' own timestamps, so month bounds don't shift with the server time zone.
+// monthIndex is zero-based and may run past December.
+function monthStartDate(year: number, monthIndex: number): string {
+  const y = year + Math.floor(monthIndex / 12);
+  const m = ((monthIndex % 12) + 12) % 12 + 1;
+  return `${y}-${String(m).padStart(2, '0')}-01`;
+}
+
+type Timeline = 'day' | 'month' | 'none';
+
+interface DashboardTotals {
+  totalSpending: number;
+  totalReceiptsProcessed: number;
+  averageTransactionValue: number;
+}
+
+// Headline metrics, rounding done in SQL
+async function queryTotals(dateFilter: string, queryParams: (string | number)[]): Promise<DashboardTotals> {
+  const totalsQuery = `
+    SELECT 
+      ROUND(COALESCE(SUM(total_amount), 0), 2) as total_spending,
+      COUNT(*) as total_receipts,
+      ROUND(COALESCE(AVG(total_amount), 0), 2) as average_transaction
+    FROM receipts
+    WHERE processing_status = 'COMPLETE' ${dateFilter}`;
+
+  const totalsResult = await withClient(client => client.query(totalsQuery, queryParams));
+  return {
+    totalSpending: totalsResult.rows[0]?.total_spending ?? 0,
+    totalReceiptsProcessed: parseInt(totalsResult.rows[0]?.total_receipts || '0', 10),
+    averageTransactionValue: totalsResult.rows[0]?.average_transaction ?? 0,
+  };
+}
+
+// Category spending, already shaped as chart nodes
+async function queryCategorySpending(dateFilter: string, queryParams: (string | number)[]): Promise<TreemapNode[]> {
+  const categoryQuery = `
+    SELECT COALESCE(li.category::text, 'Uncategorized') as name, ROUND(SUM(li.item_cost), 2) as size
+    FROM line_items li
+    JOIN receipts r ON li.receipt_id = r.receipt_id
+    WHERE r.processing_status = 'COMPLETE' ${dateFilter.replace(/purchase_datetime/g, 'r.purchase_datetime')}
+    GROUP BY li.category
+    HAVING SUM(li.item_cost) > 0
+    ORDER BY size DESC`;
+
+  const categoryResult = await withClient(client => client.query<TreemapNode>(categoryQuery, queryParams));
+  return categoryResult.rows;
+}
+
+// Spending per day for single month views, per month for multi-month views
+async function querySpendingTimeline(
+  dateFilter: string,
+  queryParams: (string | number)[],
+  timeline: Timeline
+): Promise<SpendingByDay[]> {
+  if (timeline === 'none') return [];
+
+  const bucket = timeline === 'day' ? 'DAY' : 'MONTH';
+  const timelineQuery = `
+    SELECT EXTRACT(${bucket} FROM purchase_datetime) as day, ROUND(SUM(total_amount), 2) as total_amount
+    FROM receipts
+    WHERE processing_status = 'COMPLETE' ${dateFilter}
+    GROUP BY EXTRACT(${bucket} FROM purchase_datetime)
+    ORDER BY day`;
+
+  const timelineResult = await withClient(client => client.query<SpendingByDay>(timelineQuery, queryParams));
+  return timelineResult.rows;
+}
+
+// Each chart's query runs on its own pooled client so they execute in parallel.
+const getDashboardData = unstable_cache(
+  async (
+    dateFilter: string,
+    queryParams: (string | number)[],
+    timeline: Timeline,
+    periodLabel: string,
+    periodKey: string
+  ): Promise<DashboardData> => {
+    const [totals, treemapData, spendingByDay] = await Promise.all([
+      queryTotals(dateFilter, queryParams),
+      queryCategorySpending(dateFilter, queryParams),
+      querySpendingTimeline(dateFilter, queryParams, timeline),
+    ]);
+
+    return {
+      ...totals,
+      treemapData,
+      spendingByDay,
+      month: periodLabel,
+      period: periodKey
+    };
+  },
+  ['dashboard-data'],
+  { revalidate: RECEIPTS_CACHE_TTL_SECONDS, tags: [RECEIPTS_CACHE_TAG] }
+);
+
 export async function GET(req: NextRequest) {
-  const client = await pool.connect();
   const searchParams = req.nextUrl.searchParams;
   
   // Support both old API (year/month) and new API (period)
@@ -86,98 +173,30 @@ export async function GET(req: NextRequest) {
     // Legacy month-based API
     const targetYear = parseInt(yearParam, 10);
     const targetMonth = parseInt(monthParam, 10);
+    if (!/^\d{4}$/.test(yearParam) || !/^\d{1,2}$/.test(monthParam) || targetMonth < 1 || targetMonth > 12) {
+      return NextResponse.json({ message: 'Invalid year or month parameter.' }, { status: 400 });
+    }
     const targetDate = new Date(targetYear, targetMonth - 1);
     periodLabel = targetDate.toLocaleString('default', { month: 'long', year: 'numeric' });
     
-    dateFilter = `AND EXTRACT(MONTH FROM purchase_datetime) = $1 AND EXTRACT(YEAR FROM purchase_datetime) = $2`;
-    queryParams = [targetMonth, targetYear];
+    dateFilter = `AND purchase_datetime >= $1 AND purchase_datetime < $2`;
+    queryParams = [monthStartDate(targetYear, targetMonth - 1), monthStartDate(targetYear, targetMonth)];
   } else {
     // Default to this month
     const now = new Date();
     periodLabel = now.toLocaleString('default', { month: 'long', year: 'numeric' });
-    dateFilter = `AND EXTRACT(MONTH FROM purchase_datetime) = $1 AND EXTRACT(YEAR FROM purchase_datetime) = $2`;
-    queryParams = [now.getMonth() + 1, now.getFullYear()];
+    dateFilter = `AND purchase_datetime >= $1 AND purchase_datetime < $2`;
+    queryParams = [monthStartDate(now.getFullYear(), now.getMonth()), monthStartDate(now.getFullYear(), now.getMonth() + 1)];
   }
 
-  try {
-    // Optimized: Combined query for totals
-    const totalsQuery = `
-      SELECT 
-        COALESCE(SUM(total_amount), 0) as total_spending,
-        COUNT(*) as total_receipts
-      FROM receipts
-      WHERE processing_status = 'COMPLETE' ${dateFilter}`;
-    
-    const totalsResult = await client.query(totalsQuery, queryParams);
-    const totalSpending = parseFloat(totalsResult.rows[0]?.total_spending || '0');
-    const totalReceiptsProcessed = parseInt(totalsResult.rows[0]?.total_receipts || '0', 10);
-
-    // Category spending
-    const categoryQuery = `
-      SELECT li.category::text, SUM(li.item_cost) as total_amount
-      FROM line_items li
-      JOIN receipts r ON li.receipt_id = r.receipt_id
-      WHERE r.processing_status = 'COMPLETE' ${dateFilter.replace(/purchase_datetime/g, 'r.purchase_datetime')}
-      GROUP BY li.category
-      ORDER BY total_amount DESC`;
-    
-    const categoryResult = await client.query<CategorySpending>(categoryQuery, queryParams);
-    
-    const treemapData: TreemapNode[] = categoryResult.rows
-      .filter(item => item.total_amount > 0)
-      .map(item => ({
-        name: item.category || 'Uncategorized',
-        size: parseFloat(parseFloat(String(item.total_amount)).toFixed(2))
-      }));
-
-    // Spending by day (only for single month views or recent data)
-    let spendingByDay: SpendingByDay[] = [];
-    
-    if (period === 'this_month' || (!period && yearParam && monthParam)) {
-      const dayQuery = `
-        SELECT EXTRACT(DAY FROM purchase_datetime) as day, SUM(total_amount) as sum
-        FROM receipts
-        WHERE processing_status = 'COMPLETE' ${dateFilter}
-        GROUP BY EXTRACT(DAY FROM purchase_datetime)
-        ORDER BY day`;
-      
-      const dayResult = await client.query(dayQuery, queryParams);
-      spendingByDay = dayResult.rows.map(row => ({
-        day: parseInt(row.day),
-        total_amount: parseFloat(parseFloat(String(row.sum || 0)).toFixed(2))
-      }));
-    } else if (period === '3_months' || period === '6_months') {
-      // For multi-month views, group by month instead
-      const monthQuery = `
-        SELECT 
-          TO_CHAR(purchase_datetime, 'Mon') as month_name,
-          EXTRACT(MONTH FROM purchase_datetime) as month_num,
-          SUM(total_amount) as sum
-        FROM receipts
-        WHERE processing_status = 'COMPLETE' ${dateFilter}
-        GROUP BY TO_CHAR(purchase_datetime, 'Mon'), EXTRACT(MONTH FROM purchase_datetime)
-        ORDER BY month_num`;
-      
-      const monthResult = await client.query(monthQuery, queryParams);
-      spendingByDay = monthResult.rows.map(row => ({
-        day: parseInt(row.month_num),
-        total_amount: parseFloat(parseFloat(String(row.sum || 0)).toFixed(2))
-      }));
-    }
-
-    const averageTransactionValue = totalReceiptsProcessed > 0 
-      ? parseFloat((totalSpending / totalReceiptsProcessed).toFixed(2)) 
-      : 0;
+  // Daily breakdown for single month views, monthly breakdown for multi-month views
+  const timeline: Timeline =
+    period === 'this_month' || (!period && yearParam && monthParam) ? 'day'
+    : period === '3_months' || period === '6_months' ? 'month'
+    : 'none';
 
-    const dashboardData: DashboardData = {
-      totalSpending: parseFloat(totalSpending.toFixed(2)),
-      treemapData,
-      spendingByDay,
-      totalReceiptsProcessed,
-      averageTransactionValue,
-      month: periodLabel,
-      period: period || 'custom'
-    };
+  try {
+    const dashboardData = await getDashboardData(dateFilter, queryParams, timeline, periodLabel, period || 'custom');
 
     return NextResponse.json(dashboardData);
 
@@ -187,8 +206,6 @@ export async function GET(req: NextRequest) {
       { message: 'Failed to fetch dashboard data', error: (error as Error).message }, 
       { status: 500 }
     );
-  } finally {
-    client.release();
   }
 }
 
@@ -1,6 +1,8 @@
 import { NextResponse } from 'next/server';
-import { GoogleGenerativeAI } from '@google/generative-ai';
+import { revalidateTag } from 'next/cache';
+import { GoogleGenerativeAI, GenerativeModel, Schema, SchemaType } from '@google/generative-ai';
 import { Pool, PoolClient } from 'pg';
+import { pool, RECEIPTS_CACHE_TAG } from '@/lib/db';
 
 // Retry utility function with exponential backoff
 interface RetryOptions {
@@ -51,6 +53,52 @@ async function retryWithBackoff<T>(
   throw lastError!;
 }
 
+// Async counting semaphore; a released permit is handed straight to the next waiter
+class Semaphore {
+  private available: number;
+  private readonly waiters: (() => void)[] = [];
+
+  constructor(permits: number) {
+    this.available = permits;
+  }
+
+  async run<T>(task: () => Promise<T>): Promise<T> {
+    if (this.available > 0) {
+      this.available--;
+    } else {
+      await new Promise<void>(resolve => this.waiters.push(resolve));
+    }
+
+    try {
+      return await task();
+    } finally {
+      const next = this.waiters.shift();
+      if (next) {
+        next();
+      } else {
+        this.available++;
+      }
+    }
+  }
+}
+
+// Space out calls so at most `requestsPerSecond` start each second.
+// Slots are handed out in call order, so concurrent workers can't burst past the quota.
+class RateLimiter {
+  private nextSlot = 0;
+
+  constructor(private readonly requestsPerSecond: number) {}
+
+  async acquire(): Promise<void> {
+    const now = Date.now();
+    const slot = Math.max(now, this.nextSlot);
+    this.nextSlot = slot + 1000 / this.requestsPerSecond;
+    if (slot > now) {
+      await new Promise(resolve => setTimeout(resolve, slot - now));
+    }
+  }
+}
+
 // Check if an error should not be retried
 function isNonRetryableError(error: unknown): boolean {
   if (!(error instanceof Error)) return false;
@@ -171,17 +219,14 @@ if (!dbUrl) {
   throw new Error('NEON_DATABASE_URL environment variable is not set.');
 }
 
-// Initialize Google AI Client
-const genAI = new GoogleGenerativeAI(apiKey);
+// Maximum number of receipts sent to Gemini at the same time (tune against API quota).
+// Shared by all requests handled by this process, not just the files of one upload.
+const MAX_CONCURRENT_EXTRACTIONS = Math.max(1, parseInt(process.env.GEMINI_MAX_CONCURRENCY || '4', 10) || 4);
+const extractionSlots = new Semaphore(MAX_CONCURRENT_EXTRACTIONS);
 
-// Initialize PostgreSQL Pool
-const pool = new Pool({
-  connectionString: dbUrl,
-  ssl: {
-    // Neon requires SSL
-    rejectUnauthorized: false, // Adjust as needed for your security requirements
-  },
-});
+// Proactive request pacing for Gemini; retryWithBackoff stays as the fallback for 429s
+const GEMINI_REQUESTS_PER_SECOND = parseFloat(process.env.GEMINI_REQUESTS_PER_SECOND || '5');
+const geminiRateLimiter = new RateLimiter(GEMINI_REQUESTS_PER_SECOND > 0 ? GEMINI_REQUESTS_PER_SECOND : 5);
 
 // Helper function to convert File to GenerativePart
 async function fileToGenerativePart(file: File) {
@@ -195,7 +240,7 @@ async function fileToGenerativePart(file: File) {
 }
 
 // Define the expected JSON structure for Gemini response
-// (Still useful for prompt guidance and basic validation)
+// (Mirrors receiptResponseSchema; still used for basic validation)
 interface LineItem {
   item_name: string;
   item_cost: number;
@@ -219,35 +264,62 @@ const lineItemCategories = [
   'SNACKS_SWEETS', 'FROZEN_FOODS', 'PANTRY_STAPLES', 'HOUSEHOLD_CLEANING',
   'PERSONAL_CARE', 'OTHER'
 ];
-
-// Update JSON Schema to include line item category with ENUM constraint
-const jsonSchema = `{
-  "type": "object",
-  "properties": {
-    "merchant_name": { "type": "string" },
-    "merchant_address": { "type": "string" },
-    "purchase_datetime": { "type": "string", "format": "date-time" },
-    "currency_code": { "type": "string", "maxLength": 3 },
-    "total_amount": { "type": "number" },
-    "category": { "type": "string" },
-    "line_items": {
-      "type": "array",
-      "items": {
-        "type": "object",
-        "properties": {
-          "item_name": { "type": "string" },
-          "item_cost": { "type": "number" },
-          "category": {
-            "type": "string",
-            "enum": ${JSON.stringify(lineItemCategories)}
-          }
+// O(1) membership checks when validating each extracted line item
+const lineItemCategorySet = new Set(lineItemCategories);
+
+// Response schema enforced by Gemini, including the line item category ENUM constraint
+const receiptResponseSchema: Schema = {
+  type: SchemaType.OBJECT,
+  properties: {
+    merchant_name: { type: SchemaType.STRING },
+    merchant_address: { type: SchemaType.STRING, nullable: true },
+    purchase_datetime: { type: SchemaType.STRING, description: 'ISO 8601 local date and time (YYYY-MM-DDTHH:mm:ss)' },
+    currency_code: { type: SchemaType.STRING, description: 'Three-letter ISO 4217 currency code' },
+    total_amount: { type: SchemaType.NUMBER },
+    category: { type: SchemaType.STRING },
+    line_items: {
+      type: SchemaType.ARRAY,
+      items: {
+        type: SchemaType.OBJECT,
+        properties: {
+          item_name: { type: SchemaType.STRING },
+          item_cost: { type: SchemaType.NUMBER },
+          category: { type: SchemaType.STRING, format: 'enum', enum: lineItemCategories }
         },
-        "required": ["item_name", "item_cost", "category"]
+        required: ['item_name', 'item_cost', 'category']
       }
     }
   },
-  "required": ["merchant_name", "purchase_datetime", "currency_code", "total_amount", "category", "line_items"]
-}`;
+  required: ['merchant_name', 'purchase_datetime', 'currency_code', 'total_amount', 'category', 'line_items']
+};
+
+// Extraction prompt is identical for every receipt, so build it once at module load.
+// The JSON structure itself is enforced through responseSchema.
+const extractionPrompt = `Analyze the following receipt image and extract the requested information as JSON.
+For the overall receipt, infer the category if possible (e.g., Groceries, Restaurant, Fuel, Travel, Utilities, Other), otherwise use 'Uncategorized'.
+For *each line item*, assign a category from the following list: ${lineItemCategories.join(', ')}. If an item doesn't clearly fit, use 'OTHER'.
+Ensure purchase_datetime is in ISO 8601 format (YYYY-MM-DDTHH:mm:ss). If only date is visible, use T00:00:00.
+If merchant_address is not clearly visible, set it to null.
+`;
+
+// Initialize Google AI Client and a single model instance shared by all requests
+const genAI = new GoogleGenerativeAI(apiKey);
+const model = genAI.getGenerativeModel({
+  model: "gemini-3-flash-preview",
+  generationConfig: {
+    responseMimeType: "application/json",
+    responseSchema: receiptResponseSchema,
+  },
+});
+
+// Receipt INSERT used as a named prepared statement; the text must stay constant per name
+const insertReceiptQuery = `
+  INSERT INTO receipts (
+      merchant_name, merchant_address, purchase_datetime, currency_code,
+      total_amount, category, processing_status, processed_timestamp
+  ) VALUES ($1, $2, $3, $4, $5, $6, $7, NOW())
+  RETURNING receipt_id;
+`;
 
 interface ProcessResult {
   fileName: string;
@@ -260,7 +332,7 @@ interface ProcessResult {
 }
 
 // --- Function to process a single receipt image ---
-async function processSingleReceipt(imageFile: File, genAI: GoogleGenerativeAI, pool: Pool): Promise<ProcessResult> {
+async function processSingleReceipt(imageFile: File, model: GenerativeModel, pool: Pool): Promise<ProcessResult> {
   const fileName = imageFile.name;
   console.log(`[${fileName}] Starting processing...`);
   let dbClient: PoolClient | undefined;
@@ -268,29 +340,14 @@ async function processSingleReceipt(imageFile: File, genAI: GoogleGenerativeAI,
   try {
       // 1. Gemini Processing
       // =====================
-      const model = genAI.getGenerativeModel({
-          model: "gemini-3-flash-preview",
-          generationConfig: {
-              responseMimeType: "application/json",
-          },
-      });
-
       const imagePart = await fileToGenerativePart(imageFile);
-      const prompt = `Analyze the following receipt image and extract the requested information strictly in the following JSON format.
-      For the overall receipt, infer the category if possible (e.g., Groceries, Restaurant, Fuel, Travel, Utilities, Other), otherwise use 'Uncategorized'.
-      For *each line item*, assign a category from the following list: ${lineItemCategories.join(', ')}. If an item doesn't clearly fit, use 'OTHER'.
-      Ensure purchase_datetime is in ISO 8601 format (YYYY-MM-DDTHH:mm:ss). If only date is visible, use T00:00:00.
-      If merchant_address is not clearly visible, omit it or set it to null.
-
-      JSON Schema to follow:
-      \`\`\`json
-      ${jsonSchema}
-      \`\`\`
-      `;
 
       console.log(`[${fileName}] Sending request to Gemini...`);
       const result = await retryWithBackoff(
-        () => model.generateContent([prompt, imagePart]),
+        async () => {
+          await geminiRateLimiter.acquire();
+          return model.generateContent([extractionPrompt, imagePart]);
+        },
         {
           maxAttempts: 3,
           baseDelay: 1000,
@@ -310,13 +367,19 @@ async function processSingleReceipt(imageFile: File, genAI: GoogleGenerativeAI,
       console.log(`[${fileName}] Gemini Raw Response Text (JSON expected):`, responseText.substring(0, 200) + '...'); // Log truncated response
 
       let extractedData: ExtractedReceiptData;
+      let purchaseDatetime: Date;
       try {
           extractedData = JSON.parse(responseText);
           console.log(`[${fileName}] Parsed Extracted Data (Merchant):`, extractedData.merchant_name);
           if (!extractedData.merchant_name || !extractedData.purchase_datetime || typeof extractedData.total_amount !== 'number' || !extractedData.category || !extractedData.line_items ||
-              !extractedData.line_items.every(item => item.item_name && typeof item.item_cost === 'number' && item.category && lineItemCategories.includes(item.category))) {
+              !extractedData.line_items.every(item => item.item_name && typeof item.item_cost === 'number' && item.category && lineItemCategorySet.has(item.category))) {
               throw new Error("Missing or invalid required fields in extracted data, or invalid line item category.");
           }
+          // Parse the purchase date once; the same value is reused for the insert
+          purchaseDatetime = new Date(extractedData.purchase_datetime);
+          if (isNaN(purchaseDatetime.getTime())) {
+              throw new Error(`Invalid purchase_datetime: ${extractedData.purchase_datetime}`);
+          }
       } catch (parseError) {
           console.error(`[${fileName}] Failed to parse JSON from Gemini response or validation failed:`, parseError);
           console.error(`[${fileName}] Raw response was:`, responseText);
@@ -331,40 +394,37 @@ async function processSingleReceipt(imageFile: File, genAI: GoogleGenerativeAI,
 
       await dbClient.query('BEGIN');
       try {
-          // Insert into receipts table
-          const insertReceiptQuery = `
-              INSERT INTO receipts (
-                  merchant_name, merchant_address, purchase_datetime, currency_code,
-                  total_amount, category, processing_status, processed_timestamp
-              ) VALUES ($1, $2, $3, $4, $5, $6, $7, NOW())
-              RETURNING receipt_id;
-          `;
+          // Insert into receipts table (named statement, prepared once per pooled connection)
           const receiptValues = [
               extractedData.merchant_name,
               extractedData.merchant_address ?? null, // Ensure null if undefined
-              new Date(extractedData.purchase_datetime),
+              purchaseDatetime,
               extractedData.currency_code,
               extractedData.total_amount,
               extractedData.category,
               'COMPLETE' // Set to COMPLETE directly
           ];
-          const receiptResult = await dbClient.query(insertReceiptQuery, receiptValues);
+          const receiptResult = await dbClient.query({
+              name: 'insert-receipt',
+              text: insertReceiptQuery,
+              values: receiptValues,
+          });
           const newReceiptId = receiptResult.rows[0].receipt_id;
           console.log(`[${fileName}] Inserted into receipts, ID: ${newReceiptId}`);
 
-          // Insert into line_items table
+          // Insert all line items with a single multi-row INSERT
           if (extractedData.line_items && extractedData.line_items.length > 0) {
-              const insertLineItemQuery = `
+              const lineItemValues: (string | number)[] = [newReceiptId];
+              const valuePlaceholders = extractedData.line_items.map(item => {
+                  lineItemValues.push(item.item_name, item.item_cost, item.category);
+                  const offset = lineItemValues.length;
+                  return `($1, $${offset - 2}, $${offset - 1}, $${offset})`;
+              });
+              const insertLineItemsQuery = `
                   INSERT INTO line_items (receipt_id, item_name, item_cost, category)
-                  VALUES ($1, $2, $3, $4);
+                  VALUES ${valuePlaceholders.join(', ')};
               `;
-              await Promise.all(extractedData.line_items.map(item => {
-                  const lineItemValues = [newReceiptId, item.item_name, item.item_cost, item.category];
-                   if (!dbClient) { // Re-check inside map just in case, though unlikely here
-                        throw new Error("Database client became undefined during line item insertion.");
-                   }
-                  return dbClient.query(insertLineItemQuery, lineItemValues);
-              }));
+              await dbClient.query(insertLineItemsQuery, lineItemValues);
               console.log(`[${fileName}] Inserted ${extractedData.line_items.length} line items.`);
           }
 
@@ -438,30 +498,33 @@ export async function POST(request: Request) {
 
     console.log(`Received ${imageFiles.length} image(s):`, imageFiles.map(f => f.name).join(', '));
 
-    // Process all valid image files concurrently using Promise.allSettled
-    const processingPromises = imageFiles.map(file => processSingleReceipt(file, genAI, pool));
-    const results = await Promise.allSettled(processingPromises);
-
-    // Consolidate results
-    const responsePayload: ProcessResult[] = results.map((result, index) => {
-        const fileName = imageFiles[index].name; // Get original filename for context
-        if (result.status === 'fulfilled') {
-            return result.value; // Contains ProcessResult from processSingleReceipt
-        } else {
-            // Handle unexpected errors during the promise execution itself (outside processSingleReceipt's try/catch)
-            console.error(`[${fileName}] Unexpected error in Promise.allSettled:`, result.reason);
-            const actualError = result.reason instanceof Error ? result.reason.message : String(result.reason);
-            const errorInfo = classifyError(result.reason);
-            return {
-                fileName: fileName,
-                status: 'error',
-                message: `${fileName}: ${actualError}`,
-                errorType: errorInfo.type,
-                shouldRetry: errorInfo.shouldRetry,
-                debugInfo: actualError
-            };
+    // Process all files concurrently on the event loop; the shared semaphore keeps
+    // in-flight Gemini calls within quota
+    const responsePayload: ProcessResult[] = await Promise.all(imageFiles.map(file =>
+      extractionSlots.run(async (): Promise<ProcessResult> => {
+        try {
+          return await processSingleReceipt(file, model, pool);
+        } catch (error) {
+          // Handle unexpected errors raised outside processSingleReceipt's own try/catch
+          console.error(`[${file.name}] Unexpected error during processing:`, error);
+          const actualError = error instanceof Error ? error.message : String(error);
+          const errorInfo = classifyError(error);
+          return {
+              fileName: file.name,
+              status: 'error',
+              message: `${file.name}: ${actualError}`,
+              errorType: errorInfo.type,
+              shouldRetry: errorInfo.shouldRetry,
+              debugInfo: actualError
+          };
         }
-    });
+      })
+    ));
+
+    // Drop cached receipt/dashboard reads so the new receipts show up immediately
+    if (responsePayload.some(result => result.status === 'success')) {
+      revalidateTag(RECEIPTS_CACHE_TAG);
+    }
 
     console.log("Processing complete. Sending response.");
     // Return 200 OK with the array of results
@@ -0,0 +1,66 @@
+import { NextResponse, NextRequest } from 'next/server';
+import { unstable_cache } from 'next/cache';
+import { withClient, RECEIPTS_CACHE_TAG, RECEIPTS_CACHE_TTL_SECONDS } from '@/lib/db';
+
+interface LineItem {
+  line_item_id: string;
+  item_name: string;
+  item_cost: number;
+  category: string;
+}
+
+interface ReceiptLineItemsResponse {
+  receipt_id: string;
+  line_items: LineItem[];
+}
+
+// receipts.receipt_id is a UUID; anything else is rejected before querying or caching
+const RECEIPT_ID_RE = /^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$/i;
+
+// Line items are written in receipt order by one multi-row INSERT and never
+// updated, so physical row order (ctid) is the order printed on the receipt.
+// The list preview in /api/recent-receipts sorts the same way.
+const getLineItems = unstable_cache(
+  async (receiptId: string): Promise<LineItem[]> => {
+    const result = await withClient(client => client.query<LineItem>(
+      `SELECT line_item_id, item_name, item_cost, COALESCE(category::text, 'OTHER') as category
+       FROM line_items
+       WHERE receipt_id = $1
+       ORDER BY ctid`,
+      [receiptId]
+    ));
+    return result.rows;
+  },
+  ['receipt-line-items'],
+  { revalidate: RECEIPTS_CACHE_TTL_SECONDS, tags: [RECEIPTS_CACHE_TAG] }
+);
+
+export async function GET(req: NextRequest) {
+  const receiptId = req.nextUrl.searchParams.get('receipt_id');
+
+  if (!receiptId) {
+    return NextResponse.json({ message: 'Missing receipt_id parameter.' }, { status: 400 });
+  }
+
+  if (!RECEIPT_ID_RE.test(receiptId)) {
+    return NextResponse.json({ message: 'Invalid receipt_id parameter.' }, { status: 400 });
+  }
+
+  try {
+    const lineItems = await getLineItems(receiptId.toLowerCase());
+
+    return NextResponse.json({
+      receipt_id: receiptId,
+      line_items: lineItems
+    } as ReceiptLineItemsResponse);
+
+  } catch (error) {
+    console.error('Error fetching line items:', error);
+    return NextResponse.json(
+      { message: 'Failed to fetch line items', error: (error as Error).message },
+      { status: 500 }
+    );
+  }
+}
+
+export const dynamic = 'force-dynamic';
@@ -1,17 +1,6 @@
-import { Pool } from 'pg';
 import { NextResponse, NextRequest } from 'next/server';
-
-const pool = new Pool({
-  connectionString: process.env.NEON_DATABASE_URL,
-  ssl: { rejectUnauthorized: false },
-});
-
-interface LineItem {
-  line_item_id: string;
-  item_name: string;
-  item_cost: number;
-  category: string;
-}
+import { unstable_cache } from 'next/cache';
+import { withClient, RECEIPTS_CACHE_TAG, RECEIPTS_CACHE_TTL_SECONDS } from '@/lib/db';
 
 interface Receipt {
   receipt_id: string;
@@ -22,7 +11,8 @@ interface Receipt {
   currency_code: string;
   category: string;
   processed_timestamp: string;
-  line_items: LineItem[];
+  line_item_count: number;
+  item_preview: string[];
 }
 
 interface RecentReceiptsResponse {
@@ -33,6 +23,10 @@ interface RecentReceiptsResponse {
 
 type TimePeriod = 'this_month' | '3_months' | '6_months' | 'all';
 
+const MAX_PAGE_SIZE = 50;
+// Deepest page offset served; anything beyond it is rejected rather than cached
+const MAX_OFFSET = 10000;
+
 function getDateRangeForPeriod(period: TimePeriod): { startDate: Date | null; label: string } {
   const now = new Date();
   switch (period) {
@@ -57,25 +51,17 @@ function getDateRangeForPeriod(period: TimePeriod): { startDate: Date | null; la
   }
 }
 
-export async function GET(req: NextRequest) {
-  const client = await pool.connect();
-
-  try {
-    const searchParams = req.nextUrl.searchParams;
-    const limit = Math.min(parseInt(searchParams.get('limit') || '10', 10), 50);
-    const offset = parseInt(searchParams.get('offset') || '0', 10);
-    const period = (searchParams.get('period') || 'all') as TimePeriod;
-    
-    const { startDate, label } = getDateRangeForPeriod(period);
-    
+const getRecentReceipts = unstable_cache(
+  async (limit: number, offset: number, startDate: string | null, label: string): Promise<RecentReceiptsResponse> => {
     const dateFilter = startDate 
       ? `AND purchase_datetime >= $3` 
       : '';
     const params = startDate 
-      ? [limit, offset, startDate.toISOString()] 
+      ? [limit, offset, startDate] 
       : [limit, offset];
 
-    // Optimized: single query for count and receipts using CTE
+    // Optimized: single query for count, receipts and a line item summary.
+    // Full line items are loaded on demand from /api/receipt-line-items.
     const query = `
       WITH filtered_receipts AS (
         SELECT receipt_id, merchant_name, merchant_address, total_amount, 
@@ -85,64 +71,61 @@ export async function GET(req: NextRequest) {
       ),
       counted AS (
         SELECT COUNT(*) as total FROM filtered_receipts
+      ),
+      page AS (
+        SELECT * FROM filtered_receipts
+        ORDER BY purchase_datetime DESC
+        LIMIT $1 OFFSET $2
       )
-      SELECT r.*, c.total as total_count
-      FROM filtered_receipts r, counted c
-      ORDER BY r.purchase_datetime DESC
-      LIMIT $1 OFFSET $2`;
-
-    const receiptsResult = await client.query(query, params);
-    const totalCount = parseInt(receiptsResult.rows[0]?.total_count || '0', 10);
-    const receipts = receiptsResult.rows;
+      SELECT r.*, li.line_item_count, COALESCE(li.item_preview, ARRAY[]::text[]) as item_preview,
+             c.total as total_count
+      FROM page r
+      CROSS JOIN counted c
+      LEFT JOIN LATERAL (
+        SELECT COUNT(*)::int as line_item_count, (array_agg(item_name ORDER BY ctid))[1:2] as item_preview
+        FROM line_items
+        WHERE receipt_id = r.receipt_id
+      ) li ON true
+      ORDER BY r.purchase_datetime DESC`;
+
+    return withClient(async client => {
+      const receiptsResult = await client.query<Receipt & { total_count: string }>(query, params);
 
-    if (receipts.length > 0) {
-      const receiptIds = receipts.map(r => r.receipt_id);
-      
-      // Optimized line items query
-      const lineItemsResult = await client.query(
-        `SELECT line_item_id, receipt_id, item_name, item_cost, category
-         FROM line_items 
-         WHERE receipt_id = ANY($1)`,
-        [receiptIds]
-      );
-
-      const lineItemsByReceiptId: { [key: string]: LineItem[] } = {};
-      lineItemsResult.rows.forEach(item => {
-        if (!lineItemsByReceiptId[item.receipt_id]) {
-          lineItemsByReceiptId[item.receipt_id] = [];
-        }
-        lineItemsByReceiptId[item.receipt_id].push({
-          line_item_id: item.line_item_id,
-          item_name: item.item_name,
-          item_cost: parseFloat(item.item_cost),
-          category: item.category || 'OTHER'
-        });
-      });
+      return {
+        // eslint-disable-next-line @typescript-eslint/no-unused-vars
+        receipts: receiptsResult.rows.map(({ total_count, ...receipt }) => receipt),
+        total_count: parseInt(receiptsResult.rows[0]?.total_count || '0', 10),
+        period_label: label
+      };
+    });
+  },
+  ['recent-receipts'],
+  { revalidate: RECEIPTS_CACHE_TTL_SECONDS, tags: [RECEIPTS_CACHE_TAG] }
+);
 
-      const receiptsWithLineItems: Receipt[] = receipts.map(receipt => ({
-        receipt_id: receipt.receipt_id,
-        merchant_name: receipt.merchant_name,
-        merchant_address: receipt.merchant_address,
-        total_amount: parseFloat(receipt.total_amount),
-        purchase_datetime: receipt.purchase_datetime,
-        currency_code: receipt.currency_code,
-        category: receipt.category,
-        processed_timestamp: receipt.processed_timestamp,
-        line_items: lineItemsByReceiptId[receipt.receipt_id] || []
-      }));
+export async function GET(req: NextRequest) {
+  try {
+    const searchParams = req.nextUrl.searchParams;
+    const limitParam = searchParams.get('limit') || '10';
+    const offsetParam = searchParams.get('offset') || '0';
+    if (!/^\d+$/.test(limitParam) || !/^\d+$/.test(offsetParam)) {
+      return NextResponse.json({ message: 'Invalid limit or offset parameter.' }, { status: 400 });
+    }
 
-      return NextResponse.json({
-        receipts: receiptsWithLineItems,
-        total_count: totalCount,
-        period_label: label
-      } as RecentReceiptsResponse);
+    const limit = Math.min(parseInt(limitParam, 10), MAX_PAGE_SIZE);
+    const offset = parseInt(offsetParam, 10);
+    // Only whole pages within MAX_OFFSET, so the cache key space stays bounded
+    if (limit < 1 || offset > MAX_OFFSET || offset % limit !== 0) {
+      return NextResponse.json({ message: 'Invalid limit or offset parameter.' }, { status: 400 });
     }
 
-    return NextResponse.json({
-      receipts: [],
-      total_count: totalCount,
-      period_label: label
-    } as RecentReceiptsResponse);
+    const period = (searchParams.get('period') || 'all') as TimePeriod;
+    
+    const { startDate, label } = getDateRangeForPeriod(period);
+    
+    const response = await getRecentReceipts(limit, offset, startDate?.toISOString() ?? null, label);
+
+    return NextResponse.json(response);
 
   } catch (error) {
     console.error('Error fetching receipts:', error);
@@ -150,8 +133,6 @@ export async function GET(req: NextRequest) {
       { message: 'Failed to fetch receipts', error: (error as Error).message },
       { status: 500 }
     );
-  } finally {
-    client.release();
   }
 }
 
@@ -3,6 +3,7 @@
 import { useState, useRef, ChangeEvent } from 'react';
 import Dashboard from '@/components/Dashboard';
 import ReceiptView from '@/components/ReceiptView';
+import { downscaleImage } from '@/lib/image';
 
 type Status = 'idle' | 'uploading' | 'processing' | 'success' | 'error' | 'partial_success';
 type ActiveTab = 'upload' | 'receipts' | 'dashboard';
@@ -39,12 +40,14 @@ export default function HomePage() {
     setStatus('uploading');
     setStatusMessage(`Uploading ${files.length} receipt${files.length > 1 ? 's' : ''}...`);
 
-    const formData = new FormData();
-    for (let i = 0; i < files.length; i++) {
-      formData.append('receiptImages', files[i]);
-    }
-
     try {
+      // Shrink large photos before upload to cut transfer size and extraction cost.
+      // One at a time, so only a single full-resolution bitmap is decoded at once.
+      const formData = new FormData();
+      for (const file of Array.from(files)) {
+        formData.append('receiptImages', await downscaleImage(file));
+      }
+
       setStatus('processing');
       setStatusMessage('Analyzing your receipts...');
 
@@ -240,7 +243,7 @@ export default function HomePage() {
             <UploadSection />
           </div>
         )}
-        {activeTab === 'receipts' && <ReceiptView onBack={() => setActiveTab('upload')} />}
+        {activeTab === 'receipts' && <ReceiptView />}
         {activeTab === 'dashboard' && <Dashboard />}
       </main>
     </div>
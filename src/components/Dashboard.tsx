@@ -1,6 +1,6 @@
 'use client';
 
-import { useState, useEffect, useCallback } from 'react';
+import { useState, useEffect, useCallback, useMemo } from 'react';
 import { 
     ResponsiveContainer, Tooltip,
     AreaChart, Area, XAxis, YAxis, CartesianGrid, 
@@ -8,6 +8,7 @@ import {
 } from 'recharts';
 import { TooltipProps } from 'recharts';
 import { NameType, ValueType } from 'recharts/types/component/DefaultTooltipContent';
+import { currencyFormatter } from '@/lib/format';
 
 interface TreemapNode {
     name: string;
@@ -70,9 +71,15 @@ export default function Dashboard() {
     fetchData(selectedPeriod);
   }, [selectedPeriod, fetchData]);
 
-  const formatCurrency = (amount: number) => {
-    return new Intl.NumberFormat('de-DE', { style: 'currency', currency: 'EUR' }).format(amount);
-  };
+  // Derive chart data once per response instead of on every render
+  const pieData = useMemo(() => (data?.treemapData ?? []).map(item => ({
+    name: item.name,
+    size: item.size || 0,
+  })).sort((a, b) => b.size - a.size), [data]);
+
+  const totalCategories = useMemo(() => pieData.reduce((sum, item) => sum + item.size, 0), [pieData]);
+
+  const formatCurrency = (amount: number) => currencyFormatter.format(amount);
 
   const formatCurrencyShort = (amount: number) => {
     if (amount >= 1000) return `${(amount / 1000).toFixed(1)}k`;
@@ -138,13 +145,6 @@ export default function Dashboard() {
   }
 
   if (status === 'success' && data) {
-    const pieData = data.treemapData.map(item => ({
-      name: item.name,
-      size: item.size || 0,
-    })).sort((a, b) => b.size - a.size);
-
-    const totalCategories = pieData.reduce((sum, item) => sum + item.size, 0);
-
     return (
       <div className="min-h-[calc(100vh-57px)] bg-[var(--bg-primary)] p-4 sm:p-6">
         <div className="max-w-5xl mx-auto space-y-5">
@@ -227,6 +227,7 @@ export default function Dashboard() {
                         outerRadius={100}
                         paddingAngle={2}
                         dataKey="size"
+                        isAnimationActive={false}
                       >
                         {pieData.map((entry, index) => (
                           <Cell key={`cell-${index}`} fill={PIE_COLORS[index % PIE_COLORS.length]} />
@@ -316,6 +317,7 @@ export default function Dashboard() {
                       stroke="var(--accent-gold)" 
                       strokeWidth={2}
                       fill="url(#spendingGradient)"
+                      isAnimationActive={false}
                     />
                   </AreaChart>
                 </ResponsiveContainer>
@@ -1,6 +1,7 @@
 'use client';
 
 import { useState, useEffect, useCallback } from 'react';
+import { currencyFormatter } from '@/lib/format';
 
 interface LineItem {
   line_item_id: string;
@@ -18,6 +19,12 @@ interface Receipt {
   currency_code: string;
   category: string;
   processed_timestamp: string;
+  line_item_count: number;
+  item_preview: string[];
+}
+
+interface ReceiptLineItemsResponse {
+  receipt_id: string;
   line_items: LineItem[];
 }
 
@@ -30,10 +37,6 @@ interface RecentReceiptsResponse {
 type FetchStatus = 'idle' | 'loading' | 'success' | 'error';
 type TimePeriod = 'this_month' | '3_months' | '6_months' | 'all';
 
-interface ReceiptViewProps {
-  onBack?: () => void;
-}
-
 const TIME_PERIODS: { id: TimePeriod; label: string; shortLabel: string }[] = [
   { id: 'this_month', label: 'This Month', shortLabel: 'Month' },
   { id: '3_months', label: '3 Months', shortLabel: '3M' },
@@ -41,6 +44,16 @@ const TIME_PERIODS: { id: TimePeriod; label: string; shortLabel: string }[] = [
   { id: 'all', label: 'All', shortLabel: 'All' },
 ];
 
+// Date formatters built once; constructing Intl formatters per value is expensive
+const shortDateFormatter = new Intl.DateTimeFormat('de-DE', { day: '2-digit', month: 'short' });
+const fullDateFormatter = new Intl.DateTimeFormat('de-DE', {
+  weekday: 'short',
+  day: '2-digit',
+  month: 'short',
+  year: 'numeric',
+});
+const timeFormatter = new Intl.DateTimeFormat('de-DE', { hour: '2-digit', minute: '2-digit' });
+
 const categoryColors: Record<string, string> = {
   produce: 'var(--accent-emerald)',
   dairy: 'var(--accent-sky)',
@@ -53,8 +66,7 @@ const categoryColors: Record<string, string> = {
   other: 'var(--text-muted)',
 };
 
-// eslint-disable-next-line @typescript-eslint/no-unused-vars
-export default function ReceiptView({ onBack }: ReceiptViewProps) {
+export default function ReceiptView() {
   const [receipts, setReceipts] = useState<Receipt[]>([]);
   const [status, setStatus] = useState<FetchStatus>('idle');
   const [error, setError] = useState<string | null>(null);
@@ -63,6 +75,8 @@ export default function ReceiptView({ onBack }: ReceiptViewProps) {
   const [totalCount, setTotalCount] = useState(0);
   const [selectedPeriod, setSelectedPeriod] = useState<TimePeriod>('this_month');
   const [periodLabel, setPeriodLabel] = useState<string>('');
+  const [lineItems, setLineItems] = useState<LineItem[] | null>(null);
+  const [lineItemsError, setLineItemsError] = useState<string | null>(null);
 
   const ITEMS_PER_PAGE = 10;
 
@@ -91,14 +105,37 @@ export default function ReceiptView({ onBack }: ReceiptViewProps) {
     fetchReceipts(currentPage, selectedPeriod);
   }, [currentPage, selectedPeriod, fetchReceipts]);
 
+  // Line items are only fetched once a receipt is opened
+  useEffect(() => {
+    if (!selectedReceipt) return;
+    let cancelled = false;
+    setLineItems(null);
+    setLineItemsError(null);
+
+    const fetchLineItems = async () => {
+      try {
+        const response = await fetch(`/api/receipt-line-items?receipt_id=${encodeURIComponent(selectedReceipt.receipt_id)}`);
+        if (!response.ok) throw new Error('Failed to fetch line items');
+
+        const data: ReceiptLineItemsResponse = await response.json();
+        if (!cancelled) setLineItems(data.line_items);
+      } catch (err) {
+        if (!cancelled) setLineItemsError(err instanceof Error ? err.message : 'An unknown error occurred');
+      }
+    };
+
+    fetchLineItems();
+    return () => {
+      cancelled = true;
+    };
+  }, [selectedReceipt]);
+
   const handlePeriodChange = (period: TimePeriod) => {
     setSelectedPeriod(period);
     setCurrentPage(0);
   };
 
-  const formatCurrency = (amount: number) => {
-    return new Intl.NumberFormat('de-DE', { style: 'currency', currency: 'EUR' }).format(amount);
-  };
+  const formatCurrency = (amount: number) => currencyFormatter.format(amount);
 
   const getRelativeDate = (dateString: string) => {
     const date = new Date(dateString);
@@ -111,24 +148,12 @@ export default function ReceiptView({ onBack }: ReceiptViewProps) {
     if (diffDays < 7) return `${diffDays}d ago`;
     if (diffDays < 30) return `${Math.floor(diffDays / 7)}w ago`;
     
-    return date.toLocaleDateString('de-DE', { day: '2-digit', month: 'short' });
+    return shortDateFormatter.format(date);
   };
 
-  const formatFullDate = (dateString: string) => {
-    return new Date(dateString).toLocaleDateString('de-DE', {
-      weekday: 'short',
-      day: '2-digit',
-      month: 'short',
-      year: 'numeric',
-    });
-  };
+  const formatFullDate = (dateString: string) => fullDateFormatter.format(new Date(dateString));
 
-  const formatTime = (dateString: string) => {
-    return new Date(dateString).toLocaleTimeString('de-DE', {
-      hour: '2-digit',
-      minute: '2-digit'
-    });
-  };
+  const formatTime = (dateString: string) => timeFormatter.format(new Date(dateString));
 
   const getCategoryColor = (category: string) => {
     return categoryColors[category.toLowerCase()] || categoryColors.other;
@@ -187,7 +212,13 @@ export default function ReceiptView({ onBack }: ReceiptViewProps) {
 
             {/* Line Items */}
             <div className="space-y-3 mb-8">
-              {selectedReceipt.line_items.map((item, index) => (
+              {lineItemsError && (
+                <p className="text-sm text-[var(--accent-rose)] text-center py-3">{lineItemsError}</p>
+              )}
+              {!lineItems && !lineItemsError && (
+                <p className="text-sm text-[var(--text-muted)] text-center py-3">Loading items...</p>
+              )}
+              {lineItems?.map((item, index) => (
                 <div 
                   key={item.line_item_id} 
                   className="flex justify-between items-center py-3 border-b border-[var(--border-subtle)] animate-fade-in-up"
@@ -334,9 +365,9 @@ export default function ReceiptView({ onBack }: ReceiptViewProps) {
                         {receipt.merchant_name}
                       </h3>
                       <p className="text-[11px] text-[var(--text-muted)] mt-1 truncate uppercase">
-                        {receipt.line_items.length} item{receipt.line_items.length !== 1 ? 's' : ''}
+                        {receipt.line_item_count} item{receipt.line_item_count !== 1 ? 's' : ''}
                         <span> · </span>
-                        {receipt.line_items.slice(0, 2).map(item => item.item_name).join(', ')}
+                        {receipt.item_preview.join(', ')}
                       </p>
                     </div>
                     <div className="text-right shrink-0">
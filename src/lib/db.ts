@@ -0,0 +1,32 @@
+import { Pool, PoolClient, types } from 'pg';
+
+// Decode NUMERIC columns (amounts, SUMs, EXTRACT results) once at the driver
+// instead of re-parsing the string form in every route.
+types.setTypeParser(types.builtins.NUMERIC, parseFloat);
+
+// Keep a single pool per server process, shared by every route. It lives on
+// globalThis so hot reloads and per-route bundles don't each open their own.
+const globalForDb = globalThis as unknown as { pgPool?: Pool };
+
+export const pool = globalForDb.pgPool ??= new Pool({
+  connectionString: process.env.NEON_DATABASE_URL,
+  ssl: {
+    rejectUnauthorized: false, // Required for Neon connection
+  },
+});
+
+// Check out a pooled client for the duration of `callback` and always release it
+export async function withClient<T>(callback: (client: PoolClient) => Promise<T>): Promise<T> {
+  const client = await pool.connect();
+  try {
+    return await callback(client);
+  } finally {
+    client.release();
+  }
+}
+
+// Every unstable_cache over receipt data is tagged with RECEIPTS_CACHE_TAG.
+// process-receipt revalidates the tag after saving a receipt, so cached reads
+// refresh immediately on upload; the TTL only bounds staleness from other writers.
+export const RECEIPTS_CACHE_TAG = 'receipts';
+export const RECEIPTS_CACHE_TTL_SECONDS = 300;
@@ -0,0 +1,2 @@
+// Shared by the dashboard and receipt views; constructing Intl.NumberFormat per value is expensive
+export const currencyFormatter = new Intl.NumberFormat('de-DE', { style: 'currency', currency: 'EUR' });
@@ -0,0 +1,40 @@
+// Longest edge sent for extraction; larger phone photos are scaled down before upload
+const MAX_IMAGE_DIMENSION = 1600;
+const JPEG_QUALITY = 0.85;
+
+// Downscale a receipt photo in the browser and re-encode it as JPEG.
+// Falls back to the original file when it is already small, cannot be decoded
+// (e.g. HEIC on some browsers) or the re-encoded image would not be smaller.
+export async function downscaleImage(file: File): Promise<File> {
+  if (!file.type.startsWith('image/') || typeof createImageBitmap !== 'function') return file;
+
+  let bitmap: ImageBitmap;
+  try {
+    // Apply EXIF rotation explicitly: the canvas re-encode drops the EXIF tag
+    bitmap = await createImageBitmap(file, { imageOrientation: 'from-image' });
+  } catch {
+    return file;
+  }
+
+  const scale = MAX_IMAGE_DIMENSION / Math.max(bitmap.width, bitmap.height);
+  if (scale >= 1) {
+    bitmap.close();
+    return file;
+  }
+
+  const canvas = document.createElement('canvas');
+  canvas.width = Math.round(bitmap.width * scale);
+  canvas.height = Math.round(bitmap.height * scale);
+  const context = canvas.getContext('2d');
+  if (!context) {
+    bitmap.close();
+    return file;
+  }
+  context.drawImage(bitmap, 0, 0, canvas.width, canvas.height);
+  bitmap.close();
+
+  const blob = await new Promise<Blob | null>(resolve => canvas.toBlob(resolve, 'image/jpeg', JPEG_QUALITY));
+  if (!blob || blob.size >= file.size) return file;
+
+  return new File([blob], file.name.replace(/\.[^.]+$/, '') + '.jpg', { type: 'image/jpeg' });
+}